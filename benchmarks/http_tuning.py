@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark of HTTP connection tuning (settings.py, CanonicalHostMiddleware) with a local stand-in of Multitran.
+
+The stand-in is a keep-alive HTTP/1.1 server on 127.0.0.1 which answers every request after LATENCY seconds.
+'localhost' and '127.0.0.1' are two hostnames of the same server, like multitran.com and www.multitran.com.
+It counts accepted TCP connections, so every new connection is a handshake.
+
+Scenarios:
+ - mixed-8: requests alternate hostnames, CONCURRENT_REQUESTS_PER_DOMAIN = 8 (old settings)
+ - mixed-32: requests alternate hostnames, CONCURRENT_REQUESTS_PER_DOMAIN = 32 (only concurrency and pool size changed)
+ - canonical-32: CanonicalHostMiddleware rewrites all requests to one hostname, CONCURRENT_REQUESTS_PER_DOMAIN = 32
+mixed-32 vs canonical-32 is the effect of CanonicalHostMiddleware alone.
+
+Run: python benchmarks/http_tuning.py [count of requests]
+"""
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # For multitran_scrapper importing
+
+LATENCY = 0.05  # Seconds of server's answer
+BODY = b'<html><body><table><tr><td>stand-in</td></tr></table></body></html>'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def get_request(self):
+        self.connections += 1
+        return super().get_request()
+
+
+SCENARIOS = {
+    # Name: (CanonicalHostMiddleware is enabled, CONCURRENT_REQUESTS_PER_DOMAIN)
+    'mixed-8': (False, 8),
+    'mixed-32': (False, 32),
+    'canonical-32': (True, 32),
+}
+
+
+def run_crawl(port, count, scenario):
+    """
+    It's run in subprocess, because Twisted's reactor can't be restarted
+    """
+    import scrapy
+    from scrapy.crawler import CrawlerProcess
+
+    canonical, concurrency = SCENARIOS[scenario]
+    hosts = ['127.0.0.1:{}'.format(port), 'localhost:{}'.format(port)]
+
+    class BenchmarkSpider(scrapy.Spider):
+        name = 'benchmark'
+        start_urls = ['http://{}/m.exe?s={}'.format(hosts[i % 2], i) for i in range(count)]
+
+        def parse(self, response):
+            pass
+
+    settings = {
+        'LOG_LEVEL': 'ERROR',
+        'CONCURRENT_REQUESTS': 32,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': concurrency,
+        'TELNETCONSOLE_ENABLED': False,
+    }
+    if canonical:
+        settings.update({
+            'MULTITRAN_HOST': hosts[0],
+            'MULTITRAN_HOST_ALIASES': [hosts[1]],
+            'DOWNLOADER_MIDDLEWARES': {'multitran_scrapper.middlewares.CanonicalHostMiddleware': 50},
+        })
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(BenchmarkSpider)
+    process.crawl(crawler)
+    process.start()
+    print(crawler.stats.get_value('elapsed_time_seconds'))  # Crawl time without process startup
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    server = StandInServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    print('{} requests, server latency {} s'.format(count, LATENCY))
+    for scenario in SCENARIOS:
+        server.connections = 0
+        output = subprocess.check_output([sys.executable, __file__, '--crawl', str(port), str(count), scenario])
+        elapsed = float(output.split()[-1])
+        print('{:>12}: {:.2f} s, {:.1f} ms per request, {} TCP connections'.format(
+            scenario, elapsed, elapsed * 1000 / count, server.connections))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--crawl']:
+        run_crawl(int(sys.argv[2]), int(sys.argv[3]), sys.argv[4])
+    else:
+        main()
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Library API of Multitran translation. It can be used in-process without scrapy CLI, input and output csv files.
+
+It uses the same extraction (multitran_scrapper/parsing.py) and recommendation system (recommend_translation)
+as multitran spider, so results are the same as rows of its output file.
+
+Example:
+    from multitran_scrapper.api import translate_many
+
+    async for result in translate_many(['ability', 'capability'], l1=1, l2=2):
+        print(result.word, [item['translation'] for item in result.translations])
+
+Words are downloaded and parsed in a thread pool with `concurrency` threads. At most `concurrency` words are in progress,
+the next word is started when a result is taken, so breaking the loop stops the batch.
+Results are returned in order of completion, not in order of input words.
+Cache is any dictionary-like object (for example, simple dict shared between calls). Key is (word, l1, l2, only_recommended).
+"""
+import asyncio
+import collections
+import gzip
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from scrapy import Selector
+
+from multitran_scrapper import settings
+from multitran_scrapper.items import WordTranslationItem
+from multitran_scrapper.parsing import extract_translation_blocks
+from multitran_scrapper.spiders.multitran import EXCEPTED_DICTIONARIES, ONLY_RECOMMENDATED_TRANSLATIONS, \
+    SOURCE_LANGUAGE, TARGET_LANGUAGE, TRANSLATION_URL, recommend_translation
+
+# Result for one word. translations is list of WordTranslationItem, error is exception of downloading or None
+TranslationResult = collections.namedtuple('TranslationResult', ['word', 'translations', 'error'])
+
+# Order of columns after input word in rows of extract_translation_blocks
+COLUMNS = ['translation', 'dictionary', 'block_number', 'block_name', 'author_name', 'author_link', 'comment']
+
+
+def download(url, timeout):
+    """
+    Downloads page using standard library
+    :return: text of page
+    """
+    request = urllib.request.Request(url, headers={'User-Agent': settings.USER_AGENT, 'Accept-Encoding': 'gzip'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        body = response.read()
+        if response.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return body.decode(response.headers.get_content_charset() or 'utf-8', errors='replace')
+
+
+def translate(word, l1=SOURCE_LANGUAGE, l2=TARGET_LANGUAGE, only_recommended=ONLY_RECOMMENDATED_TRANSLATIONS,
+              timeout=settings.DOWNLOAD_TIMEOUT):
+    """
+    Translates one word (synchronously)
+    :param word: word for translating
+    :param l1: source language (1 - English)
+    :param l2: target language (2 - Russian)
+    :param only_recommended: flag for selecting only recommended translations, otherwise all translations are returned
+    :param timeout: timeout of downloading (in sec)
+    :return: list of WordTranslationItem
+    """
+    text = download(TRANSLATION_URL.format(word=urllib.parse.quote(word), l1=l1, l2=l2), timeout)
+    items = []
+    for translates, output in extract_translation_blocks(Selector(text=text), [word], EXCEPTED_DICTIONARIES):
+        recommended_translation_indexes = recommend_translation(translates)
+        for i, row in enumerate(output):
+            if only_recommended and i not in recommended_translation_indexes:
+                continue
+            item = WordTranslationItem(zip(COLUMNS, row[1:]))
+            item['word'] = row[0]
+            item['recommended'] = i in recommended_translation_indexes
+            items.append(item)
+    return items
+
+
+async def translate_many(words, l1=SOURCE_LANGUAGE, l2=TARGET_LANGUAGE, concurrency=16, cache=None,
+                         only_recommended=ONLY_RECOMMENDATED_TRANSLATIONS, timeout=settings.DOWNLOAD_TIMEOUT):
+    """
+    Translates batch of words
+    :param words: words for translating
+    :param l1: source language (1 - English)
+    :param l2: target language (2 - Russian)
+    :param concurrency: maximum count of simultaneous downloads
+    :param cache: dictionary-like object for storing of translations between calls or None
+    :param only_recommended: flag for selecting only recommended translations, otherwise all translations are returned
+    :param timeout: timeout of downloading (in sec)
+    :return: async iterator of TranslationResult in order of completion
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    async def translate_word(word):
+        key = (word, l1, l2, only_recommended)
+        if cache is not None and key in cache:
+            return TranslationResult(word, cache[key], None)
+        try:
+            translations = await loop.run_in_executor(executor, translate, word, l1, l2, only_recommended, timeout)
+        except Exception as error:  # One failed word shouldn't stop the batch
+            return TranslationResult(word, [], error)
+        if cache is not None:
+            cache[key] = translations
+        return TranslationResult(word, translations, None)
+
+    words = iter(words)
+    running = set()
+    try:
+        while True:
+            # Words are started lazily, so not more than `concurrency` words are in progress
+            for word in words:
+                running.add(asyncio.ensure_future(translate_word(word)))
+                if len(running) >= concurrency:
+                    break
+            if not running:
+                break
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # The caller can stop iteration early (break or aclose), so the rest of the batch is cancelled
+        for task in running:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+        await asyncio.gather(*running, return_exceptions=True)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+# Define here the extensions for your project
+#
+# See documentation in:
+# http://doc.scrapy.org/en/latest/topics/extensions.html
+
+"""
+SamplingProfiler is a low-overhead profiler for production crawls.
+
+cProfile hooks every function call and so slows the parser down too much. This extension uses another way:
+a background thread wakes up every PROFILER_SAMPLE_INTERVAL seconds, looks at the current stack of the reactor thread
+and counts it. Only stacks which pass through one of PROFILER_FUNCTIONS (spider callbacks and DB pipeline) are counted,
+the stack is cut to start from this function. Functions are set with module ('module.function'),
+so Scrapy's or Twisted's functions with the same names (parse, process_item) aren't counted.
+
+With PARSER_PROCESSES > 0 XPath work of callbacks runs in parser worker processes (see multitran_scrapper/parsing.py)
+and this profiler doesn't see it: only waiting for the pool and writing of results are sampled in the reactor thread.
+
+Every PROFILER_DUMP_INTERVAL minutes and when the spider is closed the counted stacks are written to PROFILER_DIR
+in collapsed-stack format ('frame;frame;frame count' per line). Every file contains samples since the previous dump.
+These files can be used for flamegraph building, for example: cat profiles/*.collapsed | flamegraph.pl > parse.svg
+
+How to use:
+ - Run with profiling: scrapy crawl multitran -s PROFILER_ENABLED=1
+ - Toggle profiling at runtime (without crawl restarting): kill -USR1 <pid>
+    or from telnet console: crawler.profiler.toggle()
+"""
+import collections
+import os
+import signal
+import sys
+import threading
+import time
+
+from scrapy import signals
+from twisted.internet import task
+
+
+class SamplingProfiler(object):
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.enabled = settings.getbool('PROFILER_ENABLED')
+        self.sample_interval = settings.getfloat('PROFILER_SAMPLE_INTERVAL')
+        self.dump_interval = settings.getfloat('PROFILER_DUMP_INTERVAL') * 60  # Minutes to seconds
+        self.directory = settings.get('PROFILER_DIR')
+        # Pairs (module, function name) from PROFILER_FUNCTIONS
+        self.functions = set(tuple(function.rsplit('.', 1)) for function in settings.getlist('PROFILER_FUNCTIONS'))
+
+        self.spider_name = None
+        self.stacks = collections.Counter()  # Collapsed stack -> count of samples
+        self.lock = threading.Lock()  # Stacks are written by sampler thread and read by reactor thread
+        self.stopped = threading.Event()
+        self.thread_id = threading.get_ident()  # Extensions are created in the reactor thread
+        self.sampler = None
+        self.dump_task = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        profiler = cls(crawler)
+        crawler.profiler = profiler  # It's a handle for telnet console
+        crawler.signals.connect(profiler.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(profiler.spider_closed, signal=signals.spider_closed)
+        if hasattr(signal, 'SIGUSR1'):  # Signals aren't available on Windows
+            signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.toggle())
+        return profiler
+
+    def spider_opened(self, spider):
+        self.spider_name = spider.name
+        self.sampler = threading.Thread(target=self.sample_loop, name='SamplingProfiler', daemon=True)
+        self.sampler.start()
+        self.dump_task = task.LoopingCall(self.dump)
+        self.dump_task.start(self.dump_interval, now=False)
+
+    def spider_closed(self, spider, reason):
+        self.stopped.set()
+        if self.dump_task is not None and self.dump_task.running:
+            self.dump_task.stop()
+        self.dump()
+
+    def toggle(self):
+        """
+        Turns sampling on or off. The sampler thread is alive during all crawl and so it can be done at any time.
+        :return: new status of profiler
+        """
+        self.enabled = not self.enabled
+        self.crawler.stats.set_value('profiler/enabled', self.enabled)
+        return self.enabled
+
+    def sample_loop(self):
+        while not self.stopped.wait(self.sample_interval):
+            if self.enabled:
+                self.sample()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        root = None  # Count of frames from the top of stack to the outermost profiled function
+        while frame is not None:
+            code = frame.f_code
+            stack.append('{}:{}'.format(os.path.basename(code.co_filename), code.co_name))
+            if (frame.f_globals.get('__name__'), code.co_name) in self.functions:
+                # The stack is cut on the outermost profiled function, so everything below it is reactor's internals
+                root = len(stack)
+            frame = frame.f_back
+        if root is None:
+            return  # The reactor thread is outside of profiled functions (downloading, waiting, etc.)
+        collapsed = ';'.join(reversed(stack[:root]))
+        with self.lock:
+            self.stacks[collapsed] += 1
+
+    def dump(self):
+        """
+        Writes counted stacks into new collapsed-stack file and resets counters.
+        :return: path of file or None if nothing was sampled
+        """
+        with self.lock:
+            stacks, self.stacks = self.stacks, collections.Counter()
+        if not stacks:
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, '{}-{}.collapsed'.format(self.spider_name, time.strftime('%Y%m%d-%H%M%S')))
+        with open(path, 'a') as output_file:
+            for stack, count in stacks.most_common():
+                output_file.write('{} {}\n'.format(stack, count))
+        self.crawler.stats.inc_value('profiler/samples', sum(stacks.values()))
+        return path
@@ -18,3 +18,19 @@ class TranslationItem(scrapy.Item):
     translation = scrapy.Field()
     author_name = scrapy.Field()
     author_link = scrapy.Field()
+
+
+class WordTranslationItem(scrapy.Item):
+    """
+    This item is used in the library API (multitran_scrapper/api.py) for one translation of the requested word.
+    Fields are the same as columns of output file of multitran spider, recommended is a flag of recommendation system
+    """
+    word = scrapy.Field()
+    translation = scrapy.Field()
+    dictionary = scrapy.Field()
+    block_number = scrapy.Field()
+    block_name = scrapy.Field()
+    author_name = scrapy.Field()
+    author_link = scrapy.Field()
+    comment = scrapy.Field()
+    recommended = scrapy.Field()
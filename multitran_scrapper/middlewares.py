@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+# Define here the downloader middlewares for your project
+#
+# See documentation in:
+# http://doc.scrapy.org/en/latest/topics/downloader-middleware.html
+
+"""
+All spiders download pages only from Multitran, so all requests should go to one hostname.
+Otherwise, for example, multitran.com and www.multitran.com have separate keep-alive connection pools and DNS cache entries
+and half of connections is opened again.
+"""
+from urllib.parse import urlsplit, urlunsplit
+
+
+class CanonicalHostMiddleware(object):
+    """
+    This downloader middleware rewrites aliases of Multitran's host (MULTITRAN_HOST_ALIASES) to MULTITRAN_HOST
+    """
+
+    def __init__(self, host, aliases):
+        self.host = host
+        self.aliases = set(aliases)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings.get('MULTITRAN_HOST'), crawler.settings.getlist('MULTITRAN_HOST_ALIASES'))
+
+    def process_request(self, request, spider):
+        url = urlsplit(request.url)
+        if url.netloc in self.aliases:
+            # The new request is scheduled again instead of current one
+            return request.replace(url=urlunsplit(url._replace(netloc=self.host)))
+        return None
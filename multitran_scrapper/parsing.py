@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Extraction of rows from Multitran's pages.
+
+XPath handling is the heaviest part of parsing and by default it runs in Twisted's reactor thread,
+so slow parsing blocks downloading and one process can't use more than one core.
+Extractors below don't use Scrapy's response (only selector and simple arguments) and return simple lists,
+so ParserPool can run them in worker processes. Downloads go ahead while pages are parsed in parallel.
+
+Size of the pool is PARSER_PROCESSES from settings.py. 0 means parsing in the reactor thread (as before).
+"""
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from scrapy import Selector
+from twisted.internet import defer
+
+
+def extract_translation_blocks(selector, input_row, excepted_dictionaries):
+    """
+    It's the core of MultitranSpider.parse (multitran.py): it finds all translations of word and splits them by blocks
+    :param selector: Scrapy's response or Selector of the page
+    :param input_row: row of input file. It's copied to the beginning of every output row
+    :param excepted_dictionaries: dictionaries which shouldn't be in output
+    :return: list of blocks (translations, output) in the order of the page.
+        output is list of rows: input_row + [translation, dictionary, block number, block name, author, link on author, comment]
+    """
+
+    def get_selector_tag(selector):
+        """Returns selector tag name"""
+        return selector.xpath('name()').extract_first()
+
+    def get_all_leaf_nodes(selector):
+        """ Returns all leaf nodes using DFS"""
+        all_leaf_xpath = 'descendant-or-self::node()'
+        return selector.xpath(all_leaf_xpath)
+
+    common_row_xpath = '//*/tr[child::td[@class="gray" or @class="trans"]]'  # XPath for every row in table
+    dict_xpath = 'td[@class="subj"]/a/text()'  # Finds dictionary for every row in table (dictionary for group of translations)
+    nx_gramms_сommon_xpath = "//*/div[@class='middle_col'][3]"
+    nx_gramms_status_xpath = "p[child::a]/text()"
+    nx_gramms_words_xpath = "a[string-length(@title)>0]/text()"
+    translate_xpath = 'td[@class="trans"]'
+
+    blocks = []
+    block_number = 0
+    translates = []
+    output = []
+    for common_row in selector.xpath(common_row_xpath):
+        dictionary = common_row.xpath(dict_xpath).extract()
+        # Check type of row. If the row is translation row than go ahead
+        if len(dictionary) > 0:
+            if not dictionary[0] in excepted_dictionaries:  # Check that dictionary is acceptable
+                # Check type of phrase: it can be handled as solid or can be divided on several phrases/words
+                nx_gramms_common = selector.xpath(nx_gramms_сommon_xpath)
+                nx_gramms_status = nx_gramms_common.xpath(
+                    nx_gramms_status_xpath).extract()  # It's a status of phrase
+                # It generates string for output. It describes parts of phrase or that it is full
+                nx_gramms = 'цельное слово' if len(nx_gramms_status) == 0 else nx_gramms_status[
+                                                                                   0] + " : " + "|".join(
+                    nx_gramms_common.xpath(nx_gramms_words_xpath).extract())
+
+                # Some translations can be shown as several parts (gray, some comments in brackets). DFS is solution.
+                # The method finds all leaf text nodes. Concatenation of all nodes's text is translation
+                # All phrases are divided using ';'
+                translation_parts = []  # Translation can be divided on parts (see above). It's list of parts.
+                all_leaf_nodes = get_all_leaf_nodes(common_row.xpath(translate_xpath))
+                comment = ''
+                for node in all_leaf_nodes:
+                    flag_full_translation = False
+                    node_tag = get_selector_tag(node)
+                    if node_tag is None:  # It means that node includes only text
+                        node_value = node.extract()
+                        # It means that translation is full and let's go to next
+                        if node_value.strip() == ";":
+                            flag_full_translation = True
+                        if node == all_leaf_nodes[-1]:  # Check that node is last
+                            translation_parts.append(node_value)
+                            flag_full_translation = True
+                        if flag_full_translation:
+                            translation_value = "".join(translation_parts)
+
+                            try_find_comment = re.findall('(?P<translate_value>.*)\((?P<comment>.*)\)',
+                                                          translation_value)
+                            if len(try_find_comment) > 0:
+                                translation_value, comment = try_find_comment[0]
+                            else:
+                                comment = ''
+
+                            output_array = list(input_row)
+                            output_array.append(translation_value)
+                            output_array.append(dictionary[0])
+                            output_array.append(str(block_number))
+                            output_array.append(block_name)
+                            # output_array.append(nx_gramms) It's unused now
+
+                            output_array.append(author)
+                            output_array.append(author_href)
+                            output_array.append(comment)
+                            output_array = [x.strip() for x in output_array]
+                            output.append(output_array)
+
+                            translates.append(translation_value)
+                            translation_parts = []
+                        else:
+                            translation_parts.append(node_value)
+                    elif node_tag == "a":
+                        # Try to finds author's info
+                        author_href = node.xpath('@href').extract_first()
+                        author = re.findall('/m\.exe\?a=[0-9]*&[amp;]?UserName=(?P<author_name>.*)', author_href)
+                        if len(author) > 0:
+                            author = author[0]
+                        else:
+                            author_href = ''
+                            author = ''
+        # Another variant - the row is a system row which describes new block (name, part of speech etc) (gray background)
+        else:
+            blocks.append((translates, output))
+            translates = []
+            output = []
+            block_name = "".join(common_row.xpath('td[@class="gray"]/descendant-or-self::text()').extract())
+            block_name = block_name[:block_name.find("|")]
+            block_number += 1
+
+    blocks.append((translates, output))
+    return blocks
+
+
+def extract_dictionary_rows(selector, name):
+    """
+    It's the core of dictionary_parser (multitran_all_dictionaries.py): it finds all translations on dictionary's page
+    :param selector: Scrapy's response or Selector of the page
+    :param name: name of dictionary
+    :return: (rows, next_link). Row is ['dictionary', 'word', 'translation', 'author_name', 'author_link'],
+        rows without word (service rows) are skipped. next_link is relative link of next page ('>>') or None
+    """
+    ROW_XPATH = '//*/tr'
+    rows = []
+    for row in selector.xpath(ROW_XPATH):
+        row_value = [None] * 5
+        row_value[0] = name
+        row_value[1] = "".join(
+            row.xpath('td[@class="termsforsubject"][1]/descendant-or-self::node()/text()').extract())  # Word
+        row_value[2] = "".join(
+            row.xpath('td[@class="termsforsubject"][2]/descendant-or-self::node()/text()').extract())  # Translation
+        row_value[3] = row.xpath('td[@class="termsforsubject"][3]/a/i/text()').extract()  # Author's name
+        row_value[4] = row.xpath('td[@class="termsforsubject"][3]/a/@href').extract()  # Author's link
+        # Check type of data: useful (translations) or useless (service)
+        if len(row_value[3]) > 0:
+            row_value[3] = row_value[3][0]
+            row_value[4] = row_value[4][0]
+        else:
+            row_value[3] = ''
+            row_value[4] = ''
+        if len(row_value[1]) > 0:
+            rows.append(row_value)
+
+    next_link = selector.xpath('//*/a[contains(text(),">>")]/@href').extract_first()
+    return rows, next_link
+
+
+def parse_in_worker(extractor, text, args):
+    """
+    Entry point of worker process: it builds selector from page's text and runs extractor
+    """
+    return extractor(Selector(text=text), *args)
+
+
+class ParserPool(object):
+    """
+    Pool of parser worker processes. Without processes extractors run in the reactor thread.
+    """
+
+    def __init__(self, processes):
+        self.executor = None
+        if processes > 0:
+            # Spawn instead of fork: the crawler process has threads (reactor's thread pool, profiler)
+            self.executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+
+    def run(self, extractor, response, *args):
+        """
+        Runs extractor for response in worker process
+        :param extractor: module-level function (selector, *args) from this module
+        :param response: Scrapy's response
+        :param args: additional arguments of extractor. They should be picklable
+        :return: Deferred which is fired with result of extractor in the reactor thread
+        """
+        if self.executor is None:
+            return defer.succeed(extractor(response, *args))
+
+        from twisted.internet import reactor  # Late import: Scrapy installs reactor before crawl
+
+        deferred = defer.Deferred()
+
+        def done(future):
+            # It's called in executor's thread, so result is passed to the reactor thread
+            error = future.exception()
+            if error is not None:
+                reactor.callFromThread(deferred.errback, error)
+            else:
+                reactor.callFromThread(deferred.callback, future.result())
+
+        future = self.executor.submit(parse_in_worker, extractor, response.text, args)
+        future.add_done_callback(done)
+        return deferred
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
@@ -23,7 +23,12 @@ ROBOTSTXT_OBEY = False
 
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
 CONCURRENT_REQUESTS = 32
+# All requests go to one host, so without it the default per-domain limit (8) is the real limit.
+# It also sets size of keep-alive connection pool for the host
+CONCURRENT_REQUESTS_PER_DOMAIN = 32
 # LOG_LEVEL='INFO'
+# Count of worker processes for HTML parsing (see multitran_scrapper/parsing.py). 0 means parsing in the reactor thread
+PARSER_PROCESSES = 0
 DOWNLOAD_TIMEOUT = 120
 
 # Configure a delay for requests for the same website (default: 0)
@@ -31,9 +36,16 @@ DOWNLOAD_TIMEOUT = 120
 # See also autothrottle settings and docs
 #DOWNLOAD_DELAY = 3
 # The download delay setting will honor only one of:
-#CONCURRENT_REQUESTS_PER_DOMAIN = 16
 #CONCURRENT_REQUESTS_PER_IP = 16
 
+# Canonical hostname of Multitran. Requests to aliases are rewritten by CanonicalHostMiddleware
+MULTITRAN_HOST = 'www.multitran.com'
+MULTITRAN_HOST_ALIASES = ['multitran.com']
+
+# Connection tuning for the single-host workload. These are Scrapy's defaults, restated because the workload relies on them
+DNSCACHE_ENABLED = True  # Default: the host is resolved once
+COMPRESSION_ENABLED = True  # Default: sends 'Accept-Encoding: gzip,deflate' and decompresses responses
+
 # Disable cookies (enabled by default)
 #COOKIES_ENABLED = False
 
@@ -54,15 +66,31 @@ DOWNLOAD_TIMEOUT = 120
 
 # Enable or disable downloader middlewares
 # See http://scrapy.readthedocs.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    'multitran_scrapper.middlewares.MyCustomDownloaderMiddleware': 543,
-#}
+DOWNLOADER_MIDDLEWARES = {
+    'multitran_scrapper.middlewares.CanonicalHostMiddleware': 50,
+}
 
 # Enable or disable extensions
 # See http://scrapy.readthedocs.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
-#    'scrapy.extensions.telnet.TelnetConsole': None,
-#}
+EXTENSIONS = {
+    'multitran_scrapper.extensions.SamplingProfiler': 500,
+}
+
+# Sampling profiler of spider callbacks and DB pipeline (see multitran_scrapper/extensions.py)
+# It can be turned on from command line: scrapy crawl multitran -s PROFILER_ENABLED=1
+# and toggled at runtime using: kill -USR1 <pid>
+PROFILER_ENABLED = False
+PROFILER_SAMPLE_INTERVAL = 0.01  # Seconds between samples
+PROFILER_DUMP_INTERVAL = 5  # Minutes between writing of collapsed-stack files
+PROFILER_DIR = 'profiles'  # Directory for collapsed-stack files
+# Profiled functions as 'module.function'
+PROFILER_FUNCTIONS = [
+    'multitran_scrapper.spiders.multitran.parse',
+    'multitran_scrapper.spiders.multitran_all_dictionaries.dictionary_parser',
+    'multitran_scrapper.spiders.multitran_all_dictionaries.process_item',
+    'multitran_scrapper.spiders.multitran_dictionaries.parse_dict',
+    'multitran_scrapper.spiders.multitran_dictionaries.parse_word',
+]
 
 # Configure item pipelines
 # See http://scrapy.readthedocs.org/en/latest/topics/item-pipeline.html
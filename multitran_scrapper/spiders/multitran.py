@@ -32,6 +32,8 @@ Some comments of data:
     So you should concatenate it with 'www.multitran' with some settings of multitran (see above).
  - Start URL is http://www.multitran.com/m.exe?CL=1&s={}&l1=1&l2=2&SHL=2 where {} is a requested word.
     l1=1 means from English, l2=2 means to Russian, SHL=2 means Russian interface of site (name of dictionaries etc.), CL - ???
+ - Several language pairs can be set in LANGUAGE_PAIRS, for example [(1, 2), (1, 3)].
+    Then every pair is written to own output file (PAIR_OUTPUT_CSV_NAME) and all requests go through one crawl
 
 ## Parsing speed increasing (important settings):
 For it, you should change settings.py.
@@ -42,12 +44,14 @@ Of course, bigger CONCURRENT_REQUESTS provides big speed, but it can creates som
 With big speed the parser tries to download many links simultaneously and someone can stuck.
 When time is not critical, you should set CONCURRENT_REQUESTS < 16 otherwise > 16.
 For timeout error solving, you can increase DOWNLOAD_TIMEOUT (in sec).
+XPath parsing of pages blocks downloading when it runs in the reactor thread.
+So you can set PARSER_PROCESSES > 0 in settings.py: pages will be parsed in this count of worker processes.
 
 Also you can except some dictionaries for some narrow parsing using EXCEPTED_DICTIONARIES (dictionary abbreviation list).
 This script has two sides: engineering and analysis. All tasks connected with parsing are engineering. Recommendation system for translations is the analysis.
 
 # Recommendation translations
-See the current version in MultitranSpider.write_translations.recommend_translation
+See the current version in recommend_translation
 
 DONE:
     1.Если на странице есть несколько блоков по одному и тому же словарю, то для этого набора блоков должен выбираться один рекомендуемый перевод
@@ -67,10 +71,13 @@ DONE:
 Отсекать блоки надо на раннем этапе, до выбора рекомендуемых переводов в блоках/словарях.
 """
 import csv  # Standard library for table processing (I/O)
-import re  # Standard library for regexp. It used for check author's link
 
 import scrapy
 from scrapy import Request  # It's scrapy's request. It used for request for every new URL
+from scrapy import signals
+from scrapy.utils.defer import maybe_deferred_to_future
+
+from multitran_scrapper.parsing import ParserPool, extract_translation_blocks
 
 # Settings
 INPUT_CSV_NAME = 'tables/input.csv'  # Path to input file with csv type
@@ -81,10 +88,62 @@ OUTPUT_CSV_NAME = 'tables/output1.csv'  # Path to output file with csv type
 TRANSLATE_WORD_INDEX = 0  # Index of column which should be translated. Others columns will be copied to output file
 EXCEPTED_DICTIONARIES = ['разг.']  # Dictionaries which shouldn't be in output
 ONLY_RECOMMENDATED_TRANSLATIONS = True  # Flag for selecting only recommended translations
+# Maximum count of buffered words of every pair which wait for a slow word (for example, retried after timeout).
+# When it's reached, the slow word is passed and it will be written out of order
+REORDER_WINDOW = 1000
+# URL of translation page. l1 is the source language (1 - English), l2 is the target language (2 - Russian)
+TRANSLATION_URL = "http://www.multitran.com/m.exe?CL=1&s={word}&l1={l1}&l2={l2}&SHL=2"
+SOURCE_LANGUAGE = 1
+TARGET_LANGUAGE = 2
+# Language pairs (l1, l2) for translation. Every word is translated for every pair in one crawl
+LANGUAGE_PAIRS = [(SOURCE_LANGUAGE, TARGET_LANGUAGE)]
+# Path to output file of every pair when LANGUAGE_PAIRS has several pairs. For one pair OUTPUT_CSV_NAME is used
+PAIR_OUTPUT_CSV_NAME = 'tables/output1_{l1}_{l2}.csv'
+
+
+def recommend_translation(translations):
+    """
+    It's the main method for recommendation system.
+    Now the parser calculate recommendation between words from one block.
+    The main idea is for every word (unigrams) calculates count of phrases which includes this word.
+        After it the method calculates avg by references for every phrase and select phrases with maximum value.
+    :param translations: list of different translations of the word.
+    :return: indexes of recommended translations from input list
+    """
+
+    def calc_value(translate, unigrams):
+        words = translate.split()
+        return sum([unigrams[w] for w in words]) / len(words)
+
+    # For every word (unigrams) calculates count of references
+    unigrams = {}
+    for translate in translations:
+        for words in translate.split():
+            if unigrams.get(words, None) is None:
+                unigrams[words] = 1
+            else:
+                unigrams[words] += 1
+
+    # For every phrase calculates value based on unigrams's values and find argmax
+    maxvalue = 0
+    result = []
+    for i, translate in enumerate(translations):
+        value = calc_value(translate, unigrams)
+        if value > maxvalue:
+            maxvalue = value
+            result = [i]
+
+    return result
 
 
 class MultitranSpider(scrapy.Spider):
     name = "multitran"  # It's name of spider which should be used for spider's calling using by 'scrapy crawl nultitran'
+    # Requests are generated word by word, all pairs of the word together. FIFO queues keep this order, so pairs
+    # are interleaved with one priority (every distinct priority is a separate queue in Scrapy's scheduler)
+    custom_settings = {
+        'SCHEDULER_MEMORY_QUEUE': 'scrapy.squeues.FifoMemoryQueue',
+        'SCHEDULER_DISK_QUEUE': 'scrapy.squeues.PickleFifoDiskQueue',
+    }
 
     def __init__(self):
         """
@@ -96,14 +155,41 @@ class MultitranSpider(scrapy.Spider):
         self.input_reader = csv.reader(self.input_file, delimiter=CSV_DELIMITER, quotechar=CSV_QUOTECHAR,
                                        quoting=csv.QUOTE_ALL)
 
-        self.output_file = open(OUTPUT_CSV_NAME, 'w')
-        self.output_writer = csv.writer(self.output_file, delimiter=CSV_DELIMITER, quotechar=CSV_QUOTECHAR,
-                                        quoting=csv.QUOTE_ALL)
+        # Output file and csv writer for every language pair
+        self.output_files = {}
+        self.output_writers = {}
+        for l1, l2 in LANGUAGE_PAIRS:
+            output_name = OUTPUT_CSV_NAME if len(LANGUAGE_PAIRS) == 1 else PAIR_OUTPUT_CSV_NAME.format(l1=l1, l2=l2)
+            self.output_files[(l1, l2)] = open(output_name, 'w')
+            self.output_writers[(l1, l2)] = csv.writer(self.output_files[(l1, l2)], delimiter=CSV_DELIMITER,
+                                                       quotechar=CSV_QUOTECHAR, quoting=csv.QUOTE_ALL)
+        # Reorder buffer of every pair: responses are parsed in any order, but they are written in order of input words.
+        # pending is index of word -> blocks of translations, next_index is index of the next word for writing
+        self.pending = {pair: {} for pair in LANGUAGE_PAIRS}
+        self.next_index = {pair: 0 for pair in LANGUAGE_PAIRS}
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.parser_pool = ParserPool(crawler.settings.getint('PARSER_PROCESSES'))  # Pool for HTML parsing
+        # Requests dropped by scheduler (for example, duplicate words by dupefilter) never come to callbacks
+        crawler.signals.connect(spider.drop_word, signal=signals.request_dropped)
+        return spider
+
+    async def start(self):
+        """
+        It's a start point for Scrapy >= 2.13, older versions call start_requests directly
+        """
+        for request in self.start_requests():
+            yield request
 
     def start_requests(self):
         """
         This method is a start point for parsing.
         This method generates requests which will be handled by parse() (is written in Request.callback)
+        Requests for all language pairs go through one scheduler (so connection pool, cache and stats are shared).
+        Requests are generated word by word (all pairs of the word together) and scheduler's queues are FIFO,
+        so pairs are interleaved and every pair goes ahead with the same speed.
         :return: list of Request
         """
         requests = []  # list which will stores all Requests
@@ -111,59 +197,26 @@ class MultitranSpider(scrapy.Spider):
         for input_row in self.input_reader:
             if len(input_row) > 0:  # Filter empy rows
                 word = input_row[TRANSLATE_WORD_INDEX]  # Word for translating
-                # Generates Requests. word is used for URL building.
-                # Meta is a service dictionary which can be used in callback. Usually it stores some additional info.
-                request = Request("http://www.multitran.com/m.exe?CL=1&s={}&l1=1&l2=2&SHL=2".format(word),
-                                  callback=self.parse,
-                                  meta={"input_row": input_row, 'index': i})
-
-                requests.append(request)
+                for l1, l2 in LANGUAGE_PAIRS:
+                    # Generates Requests. word is used for URL building.
+                    # Meta is a service dictionary which can be used in callback. Usually it stores some additional info.
+                    request = Request(TRANSLATION_URL.format(word=word, l1=l1, l2=l2),
+                                      callback=self.parse, errback=self.skip_word,
+                                      meta={"input_row": input_row, 'index': i, 'pair': (l1, l2)})
+
+                    requests.append(request)
                 i += 1
         return requests
 
-    def write_translations(self, translations, output):
+    def write_translations(self, translations, output, pair):
         """
         This method is a post handling. It filters by recommendation system and stores it into output csv file.
         It is called after every block handling.
         :param translations: requested word translation list
         :param output: list of all info for every translation (dictionary, authors, etc.). Translation = [o[1] for o in output], but separate list is more convinient way
+        :param pair: language pair (l1, l2) of translations. Every pair has own output file
         :return: None
         """
-
-        def recommend_translation(translations):
-            """
-            It's the main method for recommendation system.
-            Now the parser calculate recommendation between words from one block.
-            The main idea is for every word (unigrams) calculates count of phrases which includes this word.
-                After it the method calculates avg by references for every phrase and select phrases with maximum value.
-            :param translations: list of different translations of the word.
-            :return: indexes of recommended translations from input list
-            """
-
-            def calc_value(translate, unigrams):
-                words = translate.split()
-                return sum([unigrams[w] for w in words]) / len(words)
-
-            # For every word (unigrams) calculates count of references
-            unigrams = {}
-            for translate in translations:
-                for words in translate.split():
-                    if unigrams.get(words, None) is None:
-                        unigrams[words] = 1
-                    else:
-                        unigrams[words] += 1
-
-            # For every phrase calculates value based on unigrams's values and find argmax
-            maxvalue = 0
-            result = []
-            for i, translate in enumerate(translations):
-                value = calc_value(translate, unigrams)
-                if value > maxvalue:
-                    maxvalue = value
-                    result = [i]
-
-            return result
-
         recommended_translation_indexes = recommend_translation(translations)
         if ONLY_RECOMMENDATED_TRANSLATIONS:
             # If ONLY_RECOMMENDATED than the parser stores only recommended translations. So it's filtering by precalculated indexes.
@@ -174,111 +227,82 @@ class MultitranSpider(scrapy.Spider):
                 o.append('X' if i in recommended_translation_indexes else 'O')
 
         # Write ready-to-use data to csv file
-        self.output_writer.writerows(output)
+        self.output_writers[pair].writerows(output)
+        self.crawler.stats.inc_value('multitran/pair_{}_{}/translations'.format(*pair), len(output))
 
-    def parse(self, response):
+    def buffer_translations(self, pair, index, blocks):
         """
-        It's the main handler
-        :param response: Scrapy's response
-        :return:
+        Puts blocks of translations of the word into the reorder buffer and writes all words which are ready
+        :param pair: language pair (l1, l2)
+        :param index: index of the word in input file
+        :param blocks: list of (translations, output) (see extract_translation_blocks)
+        :return: None
+        """
+        if index < self.next_index[pair]:
+            # The word was passed because of REORDER_WINDOW, so it's written at once
+            for translates, output in blocks:
+                self.write_translations(translates, output, pair)
+            return
+        self.pending[pair][index] = blocks
+        self.flush_translations(pair)
+
+    def flush_translations(self, pair, everything=False):
         """
+        Writes buffered words of pair while their indexes are contiguous (see self.pending).
+        If more than REORDER_WINDOW words are waiting, missed indexes are passed.
+        :param pair: language pair (l1, l2)
+        :param everything: flag for writing all buffered words (in order of indexes) even if some indexes are missed
+        :return: None
+        """
+        pending = self.pending[pair]
+        while pending:
+            if self.next_index[pair] not in pending:
+                if not everything and len(pending) <= REORDER_WINDOW:
+                    break
+                self.next_index[pair] = min(pending)
+            for translates, output in pending.pop(self.next_index[pair]):
+                self.write_translations(translates, output, pair)
+            self.next_index[pair] += 1
+
+    def skip_word(self, failure):
+        """
+        It's an errback of requests: the word without response is skipped, so it doesn't block the reorder buffer
+        :param failure: Twisted's failure
+        :return: None
+        """
+        meta = failure.request.meta
+        self.buffer_translations(meta['pair'], meta['index'], [])
+        self.logger.error('Failed to download %s: %s', failure.request.url, failure.value)
 
-        def get_selector_tag(selector):
-            """Returns selector tag name"""
-            return selector.xpath('name()').extract_first()
-
-        def get_all_leaf_nodes(selector):
-            """ Returns all leaf nodes using DFS"""
-            all_leaf_xpath = 'descendant-or-self::node()'
-            return selector.xpath(all_leaf_xpath)
-
-        common_row_xpath = '//*/tr[child::td[@class="gray" or @class="trans"]]'  # XPath for every row in table
-        dict_xpath = 'td[@class="subj"]/a/text()'  # Finds dictionary for every row in table (dictionary for group of translations)
-        nx_gramms_сommon_xpath = "//*/div[@class='middle_col'][3]"
-        nx_gramms_status_xpath = "p[child::a]/text()"
-        nx_gramms_words_xpath = "a[string-length(@title)>0]/text()"
-        translate_xpath = 'td[@class="trans"]'
-
-        block_number = 0
-        translates = []
-        output = []
-        for common_row in response.xpath(common_row_xpath):
-            dictionary = common_row.xpath(dict_xpath).extract()
-            # Check type of row. If the row is translation row than go ahead
-            if len(dictionary) > 0:
-                if not dictionary[0] in EXCEPTED_DICTIONARIES:  # Check that dictionary is acceptable
-                    # Check type of phrase: it can be handled as solid or can be divided on several phrases/words
-                    nx_gramms_common = response.xpath(nx_gramms_сommon_xpath)
-                    nx_gramms_status = nx_gramms_common.xpath(
-                        nx_gramms_status_xpath).extract()  # It's a status of phrase
-                    # It generates string for output. It describes parts of phrase or that it is full
-                    nx_gramms = 'цельное слово' if len(nx_gramms_status) == 0 else nx_gramms_status[
-                                                                                       0] + " : " + "|".join(
-                        nx_gramms_common.xpath(nx_gramms_words_xpath).extract())
-
-                    # Some translations can be shown as several parts (gray, some comments in brackets). DFS is solution.
-                    # The method finds all leaf text nodes. Concatenation of all nodes's text is translation
-                    # All phrases are divided using ';'
-                    translation_parts = []  # Translation can be divided on parts (see above). It's list of parts.
-                    all_leaf_nodes = get_all_leaf_nodes(common_row.xpath(translate_xpath))
-                    comment = ''
-                    for node in all_leaf_nodes:
-                        flag_full_translation = False
-                        node_tag = get_selector_tag(node)
-                        if node_tag is None:  # It means that node includes only text
-                            node_value = node.extract()
-                            # It means that translation is full and let's go to next
-                            if node_value.strip() == ";":
-                                flag_full_translation = True
-                            if node == all_leaf_nodes[-1]:  # Check that node is last
-                                translation_parts.append(node_value)
-                                flag_full_translation = True
-                            if flag_full_translation:
-                                translation_value = "".join(translation_parts)
-
-                                try_find_comment = re.findall('(?P<translate_value>.*)\((?P<comment>.*)\)',
-                                                              translation_value)
-                                if len(try_find_comment) > 0:
-                                    translation_value, comment = try_find_comment[0]
-                                else:
-                                    comment = ''
-
-                                output_array = response.meta['input_row'].copy()
-                                output_array.append(translation_value)
-                                output_array.append(dictionary[0])
-                                output_array.append(str(block_number))
-                                output_array.append(block_name)
-                                # output_array.append(nx_gramms) It's unused now
-
-                                output_array.append(author)
-                                output_array.append(author_href)
-                                output_array.append(comment)
-                                output_array = [x.strip() for x in output_array]
-                                output.append(output_array)
-
-                                translates.append(translation_value)
-                                translation_parts = []
-                            else:
-                                translation_parts.append(node_value)
-                        elif node_tag == "a":
-                            # Try to finds author's info
-                            author_href = node.xpath('@href').extract_first()
-                            author = re.findall('/m\.exe\?a=[0-9]*&[amp;]?UserName=(?P<author_name>.*)', author_href)
-                            if len(author) > 0:
-                                author = author[0]
-                            else:
-                                author_href = ''
-                                author = ''
-            # Another variant - the row is a system row which describes new block (name, part of speech etc) (gray background)
-            else:
-                self.write_translations(translates, output)
-                translates = []
-                output = []
-                block_name = "".join(common_row.xpath('td[@class="gray"]/descendant-or-self::text()').extract())
-                block_name = block_name[:block_name.find("|")]
-                block_number += 1
+    def drop_word(self, request, spider):
+        """
+        It's a handler of request_dropped signal: the dropped word is skipped, so it doesn't block the reorder buffer
+        :param request: dropped request
+        :param spider: spider of request
+        :return: None
+        """
+        if spider is self and 'pair' in request.meta and 'index' in request.meta:
+            self.buffer_translations(request.meta['pair'], request.meta['index'], [])
 
-        self.write_translations(translates, output)
+    async def parse(self, response):
+        """
+        It's the main handler.
+        Extraction of translations (see multitran_scrapper/parsing.py) can be run in parser worker processes (PARSER_PROCESSES),
+        so responses are parsed in any order. Translations are written in order of input words (meta['index']),
+        all blocks of the response are written together in the order of the page.
+        :param response: Scrapy's response
+        :return:
+        """
+        pair = response.meta['pair']
+        blocks = []  # If parsing fails, the word is skipped, so it doesn't block the reorder buffer
+        try:
+            # Deferred is wrapped for asyncio reactor (default since Scrapy 2.13)
+            blocks = await maybe_deferred_to_future(
+                self.parser_pool.run(extract_translation_blocks, response, response.meta['input_row'],
+                                     EXCEPTED_DICTIONARIES))
+        finally:
+            self.buffer_translations(pair, response.meta['index'], blocks)
+        self.crawler.stats.inc_value('multitran/pair_{}_{}/words'.format(*pair))
 
     # This method will be called after all Requests or after FATAL error.
     # Please, see about loggers and errors https://doc.scrapy.org/en/latest/topics/logging.html
@@ -294,4 +318,9 @@ class MultitranSpider(scrapy.Spider):
         :return: None
         """
         self.input_file.close()
-        self.output_file.close()
+        # Words which are waiting for a slow word are written at the end
+        for pair in LANGUAGE_PAIRS:
+            self.flush_translations(pair, everything=True)
+        for output_file in self.output_files.values():
+            output_file.close()
+        self.parser_pool.close()
@@ -21,6 +21,7 @@ DONE:
  - Add support store in DB
  - Update DB: add UNIQUE_CONSTRAINT for distinct rows storing
  - Dump on 1 million values
+ - Normalized storage: dictionaries and authors in lookup tables (see NORMALIZED_STORAGE)
 TO DO:
  - Run, run, run!
 
@@ -28,24 +29,39 @@ It hasn't input files, because the parser should download full Multitran without
 An output file - long csv file with all translations. The structure:
     'dictionary', 'word', 'translation', 'author_name', 'author_link'
 
+## Normalized storage
+Table dictionaries_unique stores dictionary and author as strings in every row,
+but there are only few hundreds of dictionaries and authors are much fewer than rows.
+So with NORMALIZED_STORAGE = True the pipeline stores them into lookup tables (dictionaries, authors)
+and translations_normalized has only integer foreign keys on them. Ids are resolved using in-process cache,
+so DB is queried only once for every dictionary or author.
+The view COMPATIBILITY_VIEW_NAME gives the old flat shape: 'id', 'dictionary', 'word', 'translation', 'author_name', 'author_link'
 
 """
 import csv  # Standard library for table processing (I/O)
 
 import scrapy
 from scrapy import Request
+from scrapy.utils.defer import maybe_deferred_to_future
 from sqlalchemy import *
 from sqlalchemy.engine.url import URL
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from twisted.internet.error import TimeoutError  # It's used for TimeOut handling
 
 from multitran_scrapper.items import TranslationItem  # The item for storing into DB
+from multitran_scrapper.parsing import ParserPool, extract_dictionary_rows
 from .database import \
     DATABASE  # Local Python's file which includes only dictionary DATABASE with connection data in SQLAlchemy format
 
+# Settings of DB storage
+NORMALIZED_STORAGE = False  # Flag for storing dictionaries and authors in lookup tables with integer foreign keys
+COMPATIBILITY_VIEW_NAME = 'dictionaries_unique_flat'  # View with the old flat shape over normalized tables
+
 # Standard SQLAlchemy part
 DeclarativeBase = declarative_base()
+NormalizedBase = declarative_base()  # Separate metadata: normalized tables are created only in normalized mode
 
 
 def db_connect():
@@ -60,6 +76,22 @@ def create_translation_table(engine):
     DeclarativeBase.metadata.create_all(engine)
 
 
+def create_normalized_tables(engine):
+    """
+    Creates lookup tables, normalized translation table and compatibility view with the old flat shape
+    """
+    NormalizedBase.metadata.create_all(engine)
+    if COMPATIBILITY_VIEW_NAME not in inspect(engine).get_view_names():
+        with engine.begin() as connection:
+            connection.execute(text(
+                "CREATE VIEW {} AS "
+                "SELECT t.id, d.name AS dictionary, t.word, t.translation, "
+                "COALESCE(a.name, '') AS author_name, COALESCE(a.link, '') AS author_link "
+                "FROM translations_normalized t "
+                "JOIN dictionaries d ON d.id = t.dictionary_id "
+                "LEFT JOIN authors a ON a.id = t.author_id".format(COMPATIBILITY_VIEW_NAME)))
+
+
 # Description of table with constraint
 class Translation(DeclarativeBase):
     __tablename__ = "dictionaries_unique"
@@ -73,18 +105,101 @@ class Translation(DeclarativeBase):
     __table_args__ = (UniqueConstraint('dictionary', 'word', name='unique_constraint'),)  # Not tested
 
 
+# Description of normalized tables
+class Dictionary(NormalizedBase):
+    __tablename__ = "dictionaries"
+
+    id = Column(Integer, primary_key=True)
+    name = Column('name', String, unique=True)
+
+
+class Author(NormalizedBase):
+    __tablename__ = "authors"
+
+    id = Column(Integer, primary_key=True)
+    name = Column('name', String)
+    link = Column('link', String)
+    __table_args__ = (UniqueConstraint('name', 'link', name='author_unique_constraint'),)
+
+
+class NormalizedTranslation(NormalizedBase):
+    __tablename__ = "translations_normalized"
+
+    id = Column(Integer, primary_key=True)
+    dictionary_id = Column('dictionary_id', Integer, ForeignKey('dictionaries.id'))
+    word = Column('word', String)
+    translation = Column('translation', String)
+    author_id = Column('author_id', Integer, ForeignKey('authors.id'), nullable=True)  # NULL for rows without author
+    __table_args__ = (UniqueConstraint('dictionary_id', 'word', name='normalized_unique_constraint'),)
+
+
 class MultitranScrapperPipeline(object):
-    def __init__(self):
+    def __init__(self, normalized=False):
         engine = db_connect()
-        create_translation_table(engine)
+        self.normalized = normalized
+        if normalized:
+            create_normalized_tables(engine)
+        else:
+            create_translation_table(engine)
         self.Session = sessionmaker(bind=engine)
+        # In-process caches of lookup tables: dictionary name -> id and (author name, author link) -> id
+        self.dictionary_ids = {}
+        self.author_ids = {}
+
+    def resolve_id(self, cache, model, key, values):
+        """
+        Finds id of the row in lookup table (dictionaries or authors) and creates the row if it's absent.
+        Lookup rows are committed in separate session, so rollback of duplicate translation doesn't remove them from cache.
+        If another process inserts the same row simultaneously, the row is found again after IntegrityError.
+        :param cache: dictionary key -> id
+        :param model: Dictionary or Author
+        :param key: key of cache
+        :param values: column values of the row
+        :return: id of the row
+        """
+        if key not in cache:
+            session = self.Session()
+            try:
+                row = session.query(model).filter_by(**values).first()
+                if row is None:
+                    row = model(**values)
+                    session.add(row)
+                    try:
+                        session.commit()
+                    except IntegrityError:
+                        session.rollback()
+                        row = session.query(model).filter_by(**values).one()
+                cache[key] = row.id
+            finally:
+                session.close()
+        return cache[key]
+
+    def normalize_item(self, item):
+        """
+        Replaces dictionary and author's info of item by ids from lookup tables
+        :param item: TranslationItem
+        :return: dictionary of values for NormalizedTranslation
+        """
+        values = dict(item)
+        dictionary = values.pop('dictionary')
+        author_name = values.pop('author_name')
+        author_link = values.pop('author_link')
+        values['dictionary_id'] = self.resolve_id(self.dictionary_ids, Dictionary, dictionary, {'name': dictionary})
+        values['author_id'] = None
+        if author_name or author_link:
+            values['author_id'] = self.resolve_id(self.author_ids, Author, (author_name, author_link),
+                                                  {'name': author_name, 'link': author_link})
+        return values
 
     def process_item(self, item):
         session = self.Session()
-        translation = Translation(**item)
         result = True
 
         try:
+            if self.normalized:
+                translation = NormalizedTranslation(**self.normalize_item(item))
+            else:
+                translation = Translation(**item)
             session.add(translation)
             session.commit()
         except:
@@ -97,7 +212,7 @@ class MultitranScrapperPipeline(object):
 
 
 # Pipeline's initialization. Many pipeline shouldn't be.
-pipeline = MultitranScrapperPipeline()
+pipeline = MultitranScrapperPipeline(normalized=NORMALIZED_STORAGE)
 
 # Settings
 # Delimiter and quotechar are parameters of csv file. You should know it if you created the file
@@ -118,6 +233,19 @@ class MultitranSpider(scrapy.Spider):
             self.output_writer = csv.writer(self.output_file, delimiter=CSV_DELIMITER, quotechar=CSV_QUOTECHAR,
                                             quoting=csv.QUOTE_ALL)
 
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.parser_pool = ParserPool(crawler.settings.getint('PARSER_PROCESSES'))  # Pool for HTML parsing
+        return spider
+
+    async def start(self):
+        """
+        It's a start point for Scrapy >= 2.13, older versions call start_requests directly
+        """
+        for request in self.start_requests():
+            yield request
+
     def start_requests(self):
         """
         This method is a start point for parsing.
@@ -140,57 +268,42 @@ class MultitranSpider(scrapy.Spider):
             yield Request(url=self.host + link, callback=self.dictionary_parser,
                           meta={'name': name, 'handled_translations': 0, 'max_count': count})
 
-    def dictionary_parser(self, response):
+    async def dictionary_parser(self, response):
         """
-        The method which parses all translations in the specific dictionary
+        The method which parses all translations in the specific dictionary.
+        Extraction of rows (see multitran_scrapper/parsing.py) can be run in parser worker processes (PARSER_PROCESSES),
+        storing is always done here in the order of the page.
         :param response:
-        :return:
+        :return: request for next page of dictionary
         """
-        END_FLAG = False
-        ROW_XPATH = '//*/tr'
-        name = response.meta['name']
-        for row in response.xpath(ROW_XPATH):
-            row_value = [None] * 5
-            row_value[0] = name
-            row_value[1] = "".join(
-                row.xpath('td[@class="termsforsubject"][1]/descendant-or-self::node()/text()').extract())  # Word
-            row_value[2] = "".join(
-                row.xpath('td[@class="termsforsubject"][2]/descendant-or-self::node()/text()').extract())  # Translation
-            row_value[3] = row.xpath('td[@class="termsforsubject"][3]/a/i/text()').extract()  # Author's name
-            row_value[4] = row.xpath('td[@class="termsforsubject"][3]/a/@href').extract()  # Author's link
-            # Check type of data: useful (translations) or useless (service)
-            if len(row_value[3]) > 0:
-                row_value[3] = row_value[3][0]
-                row_value[4] = row_value[4][0]
+        # Deferred is wrapped for asyncio reactor (default since Scrapy 2.13)
+        rows, next_link = await maybe_deferred_to_future(
+            self.parser_pool.run(extract_dictionary_rows, response, response.meta['name']))
+        for row_value in rows:
+            if USE_DATABASE:
+                # About zip: https://docs.python.org/3/library/functions.html#zip
+                values_dict = dict(
+                    zip(['dictionary', 'word', 'translation', 'author_name', 'author_link'], row_value))
+                item = TranslationItem(values_dict)  # Wrapper of data
+                db_status = pipeline.process_item(item)  # Try to store resulting translations into DB
+                if db_status:
+                    # If saving is OK
+                    response.meta['handled_translations'] += 1
+                    # else:
+                    #     self.logger.info('Exception')
             else:
-                row_value[3] = ''
-                row_value[4] = ''
-            if len(row_value[1]) > 0:
-                if USE_DATABASE:
-                    # About zip: https://docs.python.org/3/library/functions.html#zip
-                    values_dict = dict(
-                        zip(['dictionary', 'word', 'translation', 'author_name', 'author_link'], row_value))
-                    item = TranslationItem(values_dict)  # Wrapper of data
-                    db_status = pipeline.process_item(item)  # Try to store resulting translations into DB
-                    if db_status:
-                        # If saving is OK
-                        response.meta['handled_translations'] += 1
-                        # else:
-                        #     self.logger.info('Exception')
-                else:
-                    self.output_writer.writerow(row_value)  # Save data to csv file
-                    response.meta[
-                        'handled_translations'] += 1  # We can't check UNIQUE_CONSTRAINT in csv and so always increase value
+                self.output_writer.writerow(row_value)  # Save data to csv file
+                response.meta[
+                    'handled_translations'] += 1  # We can't check UNIQUE_CONSTRAINT in csv and so always increase value
 
             # Exitpoint of dictionary's parsing
             # Check count of handled translation
             if response.meta['handled_translations'] >= response.meta['max_count']:
-                END_FLAG = True
                 break
 
-        next_link = response.xpath('//*/a[contains(text(),">>")]/@href').extract()
-        if len(next_link) > 0 and not END_FLAG:
-            yield Request(url=self.host + next_link[0], callback=self.dictionary_parser, meta=response.meta)
+        if next_link is not None and response.meta['handled_translations'] < response.meta['max_count']:
+            return [Request(url=self.host + next_link, callback=self.dictionary_parser, meta=response.meta)]
+        return []
 
     # The method which handled TimeOut exception
     def errback_httpbin(self, failure):
@@ -199,5 +312,6 @@ class MultitranSpider(scrapy.Spider):
 
     def close(self, reason):
         self.timeout_errors.close()
+        self.parser_pool.close()
         if not USE_DATABASE:
             self.output_file.close()
@@ -69,7 +69,7 @@ class MultitranSpider(scrapy.Spider):
         for dictionaries in response.xpath(dict_xpath):
             # print(i)
             # i += 1
-            yield Request("http://multitran.com{}&SHL=2".format(dictionaries.extract()), callback=self.parse_dict)
+            yield Request("http://www.multitran.com{}&SHL=2".format(dictionaries.extract()), callback=self.parse_dict)
 
     def parse_dict(self, response):
         # print(response.url)
@@ -83,7 +83,7 @@ class MultitranSpider(scrapy.Spider):
                 self.output_writer.writerow(row)
                 self.output.append("|".join(row))
         else:
-            url = "http://multitran.com{}&SHL=2".format(
+            url = "http://www.multitran.com{}&SHL=2".format(
                 response.xpath('//*/tr/td[@class="termsforsubject"][1]/a/@href').extract()[0])
             # print(url)
             yield Request(url=url, callback=self.parse_word,
@@ -94,7 +94,7 @@ class MultitranSpider(scrapy.Spider):
         dict_xpath = '//*/td[@class="subj"]/a'
         for d in response.xpath(dict_xpath):
             name = d.xpath("text()").extract()[0]
-            url = "http://multitran.com{}&SHL=2".format(d.xpath("@href").extract()[0])
+            url = "http://www.multitran.com{}&SHL=2".format(d.xpath("@href").extract()[0])
             yield Request(url=url, callback=self.parse_dict,
                           meta={"dict_abbr": name})
 
@@ -7,12 +7,15 @@ import csv
 import scrapy
 from scrapy import Request
 
+from multitran_scrapper.spiders.multitran import LANGUAGE_PAIRS, TRANSLATION_URL
+
 # Settings
 # Delimiter and quotechar are parameters of csv file. You should know it if you created the file
 CSV_DELIMITER = '	'
 CSV_QUOTECHAR = '"'  # '|'
 INPUT_NAME = 'input.txt'
 OUTPUT_CSV_NAME = 'technology.csv'  # Path to output file with csv type
+PAIR_OUTPUT_CSV_NAME = 'technology_{l1}_{l2}.csv'  # Path to output file of every pair when LANGUAGE_PAIRS has several pairs
 
 ONLY_RECOMMENDATED_TRANSLATIONS = True
 COLUMNS = ['Input word', 'Translations', 'Dictionary', 'Block number', 'Block name', 'Author', 'Link on author',
@@ -22,18 +25,37 @@ COLUMNS = ['Input word', 'Translations', 'Dictionary', 'Block number', 'Block na
 class MultitranSpider(scrapy.Spider):
     name = "multitran_technology"
     allowed_domains = ["multitran.com"]
+    # Requests are generated theme by theme, all pairs of the theme together. FIFO queues keep this order, so pairs
+    # are interleaved with one priority (every distinct priority is a separate queue in Scrapy's scheduler)
+    custom_settings = {
+        'SCHEDULER_MEMORY_QUEUE': 'scrapy.squeues.FifoMemoryQueue',
+        'SCHEDULER_DISK_QUEUE': 'scrapy.squeues.PickleFifoDiskQueue',
+    }
 
     def __init__(self):
         self.input_file = open(INPUT_NAME, 'r')
-        self.output_file = open(OUTPUT_CSV_NAME, 'w')
-        self.output_writer = csv.writer(self.output_file, delimiter=CSV_DELIMITER, quotechar=CSV_QUOTECHAR,
-                                        quoting=csv.QUOTE_ALL)
+        # Output file and csv writer for every language pair
+        self.output_files = {}
+        self.output_writers = {}
+        for l1, l2 in LANGUAGE_PAIRS:
+            output_name = OUTPUT_CSV_NAME if len(LANGUAGE_PAIRS) == 1 else PAIR_OUTPUT_CSV_NAME.format(l1=l1, l2=l2)
+            self.output_files[(l1, l2)] = open(output_name, 'w')
+            self.output_writers[(l1, l2)] = csv.writer(self.output_files[(l1, l2)], delimiter=CSV_DELIMITER,
+                                                       quotechar=CSV_QUOTECHAR, quoting=csv.QUOTE_ALL)
+
+    async def start(self):
+        """
+        It's a start point for Scrapy >= 2.13, older versions call start_requests directly
+        """
+        for request in self.start_requests():
+            yield request
 
     def start_requests(self):
         requests = []
         for request in self.input_file:
-            requests.append(Request(url='http://www.multitran.com/m.exe?CL=1&s={}&l1=1&l2=2&SHL=2'.format(request),
-                                    meta={'theme': request}))
+            for l1, l2 in LANGUAGE_PAIRS:
+                requests.append(Request(url=TRANSLATION_URL.format(word=request, l1=l1, l2=l2),
+                                        meta={'theme': request, 'pair': (l1, l2)}))
         return requests
 
     def parse(self, response):
@@ -43,7 +65,8 @@ class MultitranSpider(scrapy.Spider):
         for common_row in response.xpath(common_row_xpath):
             link = "http://www.multitran.com{}".format(common_row.xpath('@href').extract_first())
             name = common_row.xpath('text()').extract_first()
-            yield scrapy.Request(url=link, callback=self.parse_dictionary, meta={'name': name, 'theme': theme})
+            yield scrapy.Request(url=link, callback=self.parse_dictionary,
+                                 meta={'name': name, 'theme': theme, 'pair': response.meta['pair']})
 
     def parse_dictionary(self, response):
         name = response.meta['name']
@@ -58,7 +81,8 @@ class MultitranSpider(scrapy.Spider):
             row_value[2] = name
             row_value[3] = theme
             if row_value[0] is not None:
-                self.output_writer.writerow(row_value)
+                self.output_writers[response.meta['pair']].writerow(row_value)
 
     def close(self, reason):
-        self.output_file.close()
+        for output_file in self.output_files.values():
+            output_file.close()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+translate_many with stubbed translation of one word (without network).
+"""
+import asyncio
+import threading
+import time
+
+from multitran_scrapper import api
+
+
+def stub_translate(calls, delay=0.05):
+    lock = threading.Lock()
+
+    def translate(word, l1, l2, only_recommended, timeout):
+        with lock:
+            calls.append(word)
+        time.sleep(delay)
+        if word == 'bad':
+            raise IOError('Connection refused')
+        return [word.upper()]
+
+    return translate
+
+
+def test_error_of_word_does_not_stop_batch(monkeypatch):
+    calls = []
+    monkeypatch.setattr(api, 'translate', stub_translate(calls))
+
+    async def collect():
+        return [result async for result in api.translate_many(['one', 'bad', 'two'], concurrency=2)]
+
+    results = {result.word: result for result in asyncio.run(collect())}
+    assert results['one'] == api.TranslationResult('one', ['ONE'], None)
+    assert results['two'] == api.TranslationResult('two', ['TWO'], None)
+    assert results['bad'].translations == []
+    assert isinstance(results['bad'].error, IOError)
+
+
+def test_cache(monkeypatch):
+    calls = []
+    monkeypatch.setattr(api, 'translate', stub_translate(calls))
+    cache = {}
+
+    async def collect():
+        return [result async for result in api.translate_many(['one', 'two'], cache=cache)]
+
+    asyncio.run(collect())
+    asyncio.run(collect())
+    assert sorted(calls) == ['one', 'two']
+    assert cache[('one', 1, 2, True)] == ['ONE']
+
+
+def test_early_exit_stops_batch(monkeypatch):
+    calls = []
+    monkeypatch.setattr(api, 'translate', stub_translate(calls))
+    words = ['word{}'.format(i) for i in range(200)]
+
+    async def first_result():
+        results = api.translate_many(words, concurrency=4)
+        async for result in results:
+            break
+        await results.aclose()
+        await asyncio.sleep(0.5)  # Time for 40 more words if the batch went on
+        return result
+
+    assert asyncio.run(first_result()).word in words
+    assert len(calls) <= 4
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Matching of profiled functions in SamplingProfiler.
+"""
+import types
+
+from scrapy.settings import Settings
+
+from multitran_scrapper.extensions import SamplingProfiler
+
+
+def make_profiler(functions):
+    settings = Settings()
+    settings.setmodule('multitran_scrapper.settings')
+    settings.set('PROFILER_FUNCTIONS', functions)
+    return SamplingProfiler(types.SimpleNamespace(settings=settings))
+
+
+def parse(profiler):
+    profiler.sample()  # The profiler samples the current thread
+
+
+def test_function_is_matched_with_module():
+    profiler = make_profiler(['{}.parse'.format(__name__)])
+    parse(profiler)
+    (stack, count), = profiler.stacks.items()
+    assert stack == 'test_extensions.py:parse;extensions.py:sample'
+    assert count == 1
+
+
+def test_function_of_another_module_is_not_matched():
+    profiler = make_profiler(['multitran_scrapper.spiders.multitran.parse'])
+    parse(profiler)
+    assert not profiler.stacks
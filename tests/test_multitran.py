@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Requests of multitran spider for several language pairs.
+"""
+from multitran_scrapper.parsing import ParserPool
+from multitran_scrapper.spiders import multitran
+
+
+def test_pairs_are_interleaved_with_one_priority(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'tables').mkdir()
+    (tmp_path / 'tables' / 'input.csv').write_text('alpha\n\nbeta\n')
+    monkeypatch.setattr(multitran, 'LANGUAGE_PAIRS', [(1, 2), (1, 3)])
+
+    spider = multitran.MultitranSpider()
+    requests = spider.start_requests()
+    spider.input_file.close()
+    for output_file in spider.output_files.values():
+        output_file.close()
+
+    assert [(r.meta['index'], r.meta['pair']) for r in requests] == [(0, (1, 2)), (0, (1, 3)),
+                                                                     (1, (1, 2)), (1, (1, 3))]
+    assert {r.priority for r in requests} == {0}
+    assert sorted(path.name for path in (tmp_path / 'tables').iterdir()) == ['input.csv', 'output1_1_2.csv',
+                                                                            'output1_1_3.csv']
+
+
+def test_slow_word_is_passed_after_reorder_window(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'tables').mkdir()
+    (tmp_path / 'tables' / 'input.csv').write_text('')
+    monkeypatch.setattr(multitran, 'REORDER_WINDOW', 2)
+    monkeypatch.setattr(multitran, 'ONLY_RECOMMENDATED_TRANSLATIONS', False)
+
+    spider = multitran.MultitranSpider()
+    spider.parser_pool = ParserPool(0)
+    written = []
+    monkeypatch.setattr(spider, 'write_translations', lambda translates, output, pair: written.extend(translates))
+
+    pair = (1, 2)
+    spider.buffer_translations(pair, 1, [(['one'], [['w1', 'one']])])
+    spider.buffer_translations(pair, 2, [(['two'], [['w2', 'two']])])
+    assert written == []  # Words wait for the slow word 0
+    spider.buffer_translations(pair, 3, [(['three'], [['w3', 'three']])])
+    assert written == ['one', 'two', 'three']  # The window is full, so the slow word is passed
+    spider.buffer_translations(pair, 0, [(['zero'], [['w0', 'zero']])])
+    assert written == ['one', 'two', 'three', 'zero']  # The late word is written at once
+    spider.close('finished')
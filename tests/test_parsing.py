@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Crawl of multitran spider against a local stand-in of Multitran with parser worker processes.
+"""
+import csv
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORDS = ['alpha', 'beta', 'gamma', 'delta', 'epsilon']
+
+PAGE = '''<html><body><table>
+<tr><td class="gray">{word} n | </td></tr>
+<tr><td class="subj"><a href="/m.exe?a=110">gen.</a></td>
+<td class="trans"><a href="/m.exe?a=5&UserName=Ivan">{word}-translation</a></td></tr>
+</table></body></html>'''
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        word = parse_qs(urlsplit(self.path).query)['s'][0]
+        if word in WORDS:
+            time.sleep(0.1 * (len(WORDS) - WORDS.index(word)))  # The first words are answered last
+        body = PAGE.format(word=word).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_crawl(port, processes):
+    """
+    It's run in subprocess, because Twisted's reactor can't be restarted
+    """
+    from scrapy import signals
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.settings import Settings
+
+    from multitran_scrapper.spiders import multitran
+
+    multitran.TRANSLATION_URL = 'http://127.0.0.1:%d/m.exe?s={word}&l1={l1}&l2={l2}' % port
+    settings = Settings()
+    settings.setmodule('multitran_scrapper.settings')
+    settings.set('PARSER_PROCESSES', processes)
+    settings.set('LOG_LEVEL', 'ERROR')
+    settings.set('TELNETCONSOLE_ENABLED', False)
+    settings.set('SPIDER_MODULES', [])  # multitran_all_dictionaries needs local database.py
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(multitran.MultitranSpider)
+
+    def spider_idle(spider):
+        # All responses are handled, but the spider isn't closed yet
+        print('written before close:', crawler.stats.get_value('multitran/pair_1_2/translations', 0), flush=True)
+
+    crawler.signals.connect(spider_idle, signal=signals.spider_idle)
+    process.crawl(crawler)
+    process.start()
+
+
+def crawl(tmp_path, words):
+    """
+    Runs multitran spider with 2 parser processes for words
+    :return: (rows of output file, count of rows written before spider's closing)
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        (tmp_path / 'tables').mkdir()
+        with open(str(tmp_path / 'tables' / 'input.csv'), 'w') as input_file:
+            input_file.write('\n'.join(words) + '\n')
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), str(server.server_address[1]), '2'],
+                                cwd=str(tmp_path), env=dict(os.environ, PYTHONPATH=ROOT), check=True, timeout=120,
+                                stdout=subprocess.PIPE, universal_newlines=True).stdout
+    finally:
+        server.shutdown()
+
+    with open(str(tmp_path / 'tables' / 'output1.csv')) as output_file:
+        rows = list(csv.reader(output_file, delimiter='\t'))
+    written = int(output.split('written before close:')[1].split()[0])
+    return rows, written
+
+
+def test_crawl_with_parser_processes(tmp_path):
+    rows, written = crawl(tmp_path, WORDS)
+    # Responses come in reverse order, but rows are written in order of input words
+    assert [row[0] for row in rows] == WORDS
+    assert [row[1] for row in rows] == ['{}-translation'.format(word) for word in WORDS]
+    assert rows[0][2:7] == ['gen.', '1', 'alpha n', 'Ivan', '/m.exe?a=5&UserName=Ivan']
+
+    assert written == len(WORDS)
+
+
+def test_duplicate_word_does_not_block_output(tmp_path):
+    # The second 'w0' is dropped by dupefilter, so its index never comes to callbacks
+    words = ['w0', 'w0'] + ['w{}'.format(i) for i in range(1, 20)]
+    rows, written = crawl(tmp_path, words)
+    assert [row[0] for row in rows] == ['w0'] + words[2:]
+    assert written == len(rows)
+
+
+if __name__ == '__main__':
+    run_crawl(int(sys.argv[1]), int(sys.argv[2]))